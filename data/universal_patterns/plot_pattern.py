@@ -1,8 +1,33 @@
 #/usr/bin/env python3
-import graphviz
 from argparse import ArgumentParser
 import json
 import os
+import re
+import subprocess
+import sys
+
+# above this many entities, dot's crossing minimization takes too long and
+# the force-directed sfdp layout is used instead
+MAX_DOT_ENTITIES = 200
+
+
+def quote(s: str) -> str:
+    # only the unescaped quotes, i.e. those after an even number of
+    # backslashes, are escaped, so that `\n` stays a line break. A trailing
+    # odd backslash would escape the closing quote, so it is doubled.
+    s = re.sub(r'(?<!\\)((?:\\\\)*)"', r'\1\\"', s)
+    if (len(s) - len(s.rstrip('\\'))) % 2 == 1:
+        s += '\\'
+    return '"{}"'.format(s)
+
+
+def view(path: str):
+    if sys.platform == 'win32':
+        os.startfile(path)
+    else:
+        opener = 'open' if sys.platform == 'darwin' else 'xdg-open'
+        subprocess.Popen([opener, path])
+
 
 if __name__ == '__main__':
     parser = ArgumentParser()
@@ -15,25 +40,38 @@ if __name__ == '__main__':
     pattern = json.load(open(args.pattern_file))
     graph_name = os.path.basename(args.pattern_file).removesuffix('.json')
 
-    dot = graphviz.Digraph(graph_name, format='pdf')  
+    buf = ['digraph {} {{\n'.format(quote(graph_name))]
     for entity in pattern['Entities']:
         id = str(entity['ID'])
         signature = r'ID:{}\n{}'.format(id, entity['Signature'])
-        dot.node(id, signature)
-    
+        buf.append('\t{} [label={}]\n'.format(quote(id), quote(signature)))
+
     for event in pattern['Events']:
-        subject = str(event['SubjectID'])
-        object = str(event['ObjectID'])
+        subject = quote(str(event['SubjectID']))
+        object = quote(str(event['ObjectID']))
         if 'Type' in event and event['Type'] == 'Flow':
             label = r'ID:{}'.format(event['ID'])
-            dot.edge(subject, object, label=label, style='dashed')
+            buf.append('\t{} -> {} [label={} style=dashed]\n'.format(subject, object, quote(label)))
         elif 'Frequency' in event:
             signature = event['Signature']
             label = r'ID:{}\n{}\nFrequency:{}'.format(event['ID'], signature, event['Frequency'])
-            dot.edge(subject, object, label=label)
+            buf.append('\t{} -> {} [label={}]\n'.format(subject, object, quote(label)))
         else:
             signature = event['Signature']
             label = r'ID:{}\n{}'.format(event['ID'], signature)
-            dot.edge(subject, object, label=label)
+            buf.append('\t{} -> {} [label={}]\n'.format(subject, object, quote(label)))
+    buf.append('}\n')
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    source_file = os.path.join(args.out_dir, graph_name + '.gv')
+    out_file = source_file + '.pdf'
+    with open(source_file, 'w') as f:
+        f.write(''.join(buf))
 
-    dot.render(view=True, directory=args.out_dir)
+    layout = 'sfdp' if len(pattern['Entities']) > MAX_DOT_ENTITIES else 'dot'
+    subprocess.run(
+        ['dot', f'-K{layout}', '-Tpdf', '-Goutputorder=edgesfirst', '-Granksep=1.5', '-Nshape=rect',
+         '-o', out_file, source_file],
+        check=True,
+    )
+    view(out_file)
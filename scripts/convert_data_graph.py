@@ -1,30 +1,77 @@
-import fileinput
+import os
 import re
+import shutil
 import sys
+import tempfile
+from typing import BinaryIO
 
-pattern = re.compile(r'(.+)#(\w+::.+)#(\w+::.+)')
+pattern = re.compile(rb'(.+)#(\w+::.+)#(\w+::.+)')
 
-if __name__ == '__main__':
-    for line in fileinput.input(inplace=True):
-        if len(line) == 0:
-            continue
+BUFFER_SIZE = 1 << 20
+
+
+def convert_line(line: bytes) -> bytes | None:
+    """
+    Convert a line of the old data graph format into the new format.
+
+    Returns:
+        The converted line, or None if the line is a bad record
+    """
+    columns = line.rstrip(b'\r\n').split(b',')
+    if len(columns) != 6:
+        return line
+
+    t1, t2, sig, event_id, subject_id, object_id = columns
+    split = sig.split(b'#')
+    if len(split) == 3:
+        event_sig, subject_sig, object_sig = split
+    else:
+        found = pattern.search(sig)
+        if found is None:
+            return None
+        event_sig, subject_sig, object_sig = found.groups()
 
-        columns = line.strip().split(',')
-        if len(columns) != 6:
-            print(line, end='')
+    newline = b'\n' if line.endswith(b'\n') else b''
+    return b','.join([t1, t2, event_id, event_sig, subject_id, subject_sig, object_id, object_sig]) + newline
+
+
+def convert_stream(inp: BinaryIO, out: BinaryIO):
+    buf = bytearray()
+    for line in inp:
+        converted = convert_line(line)
+        if converted is None:
+            print('Bad record:', line.strip().decode(errors='replace'), file=sys.stderr)
             continue
+        buf += converted
+        if len(buf) >= BUFFER_SIZE:
+            out.write(buf)
+            buf.clear()
+    out.write(buf)
+    out.flush()
+
 
-        t1, t2, sig, event_id, subject_id, object_id = columns
-        split = sig.split('#')
-        if len(split) == 3:
-            event_sig, subject_sig, object_sig = split
-        else:
-            found = pattern.search(sig)
-            if found is None:
-                print('Bad record:', line.strip(), file=sys.stderr)
-                continue
-            event_sig = found.group(1)
-            subject_sig = found.group(2)
-            object_sig = found.group(3)
-
-        print(','.join([t1, t2, event_id, event_sig, subject_id, subject_sig, object_id, object_sig]), end='\n' if line.endswith('\n') else '')
+def convert_inplace(path: str):
+    """
+    Convert the file at `path`, writing to a temporary file which then
+    atomically replaces the original one.
+    """
+    out_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    try:
+        with open(path, 'rb', buffering=BUFFER_SIZE) as inp, \
+                os.fdopen(fd, 'wb', buffering=BUFFER_SIZE) as out:
+            convert_stream(inp, out)
+        # mkstemp creates the file as 0600, keep the mode of the original
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            convert_inplace(path)
+    else:
+        convert_stream(sys.stdin.buffer, sys.stdout.buffer)
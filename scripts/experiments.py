@@ -1,16 +1,45 @@
 import typing as t
 import subprocess
 from subprocess import Popen, PIPE
+from concurrent.futures import ThreadPoolExecutor
 import re
 import os
-import pandas as pd
 import json
 import argparse
 import asyncio
+import contextlib
+import csv
+import functools
+import hashlib
+import inspect
+import math
+import queue
+import resource
+import shlex
+import shutil
+import statistics
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+
+# pandas is only imported by the functions building tables, so that
+# run_all.py can import the helpers here without loading it
+if t.TYPE_CHECKING:
+    import pandas as pd
 
 IPMES_PLUS = "IPMES_PLUS/"
 TIMING = "timingsubg/rdf/"
 IPMES = "IPMES/"
+IPMES_PLUS_BINARY = os.path.join(IPMES_PLUS, "target/release/ipmes-rust")
+# IPMES+ built without the join layer optimization, see exp_join_layer_optimization
+IPMES_PLUS_UNOPTIMIZED_TARGET = "target/unoptimized/"
+IPMES_PLUS_UNOPTIMIZED_BINARY = os.path.join(
+    IPMES_PLUS, IPMES_PLUS_UNOPTIMIZED_TARGET, "release/ipmes-rust"
+)
+IPMES_JAVA = os.path.join(IPMES, "ipmes-java/")
+IPMES_POM = os.path.join(IPMES_JAVA, "pom.xml")
+# the dependency classpath of IPMES, written by build_ipmes
+IPMES_CLASSPATH_FILE = os.path.join(IPMES_JAVA, "target/classpath.txt")
 
 DATA_GRAPH_DIR = "data_graphs/"
 OLD_DATA_GRAPH_DIR = "old_data_graphs/"
@@ -18,107 +47,478 @@ SYNTH_GRAPH_DIR = "synthesized_graphs/"
 FLOW_DATA_GRAPH_DIR = "modified_data_graphs/"
 
 PATTERN_DIR = os.path.join(IPMES_PLUS, "data/universal_patterns/")
+FREQ_PATTERN_DIR = os.path.join(IPMES_PLUS, "data/freq_patterns/")
+FLOW_PATTERN_DIR = os.path.join(IPMES_PLUS, "data/flow_patterns/")
 OLD_PATTERN_DIR = os.path.join(IPMES, "data/universal_patterns/")
 OLD_SUBPATTERN_DIR = os.path.join(TIMING, "data/universal_patterns/subpatterns/")
 
 OUT_DIR = "results/"
 
-
-def build_ipmes_plus():
-    cwd = os.getcwd()
-    os.chdir(IPMES_PLUS)
+# window size (sec) of the patterns, keyed by the prefix of the pattern name
+WINDOW_SIZES = {"SP": 1800, "DP": 1000}
+
+# resolve maven dependencies with parallel downloads on a cold local repository
+MAVEN_BUILD_ENV = {
+    **os.environ,
+    "MAVEN_OPTS": (os.environ.get("MAVEN_OPTS", "") + " -Dmaven.artifact.threads=8").strip(),
+}
+
+# the prefixes of the summary lines printed by IPMES+ and Timing
+NUM_MATCH_PREFIX = "Total number of matches: "
+CPU_TIME_PREFIX = "CPU time elapsed: "
+PEAK_MEM_PREFIX = "Peak memory usage: "
+# the fields read from the JSON summary printed by IPMES
+PEAK_HEAP_PATTERN = re.compile(r'"PeakHeapSize"\s*:\s*(\d+)')
+NUM_RESULTS_PATTERN = re.compile(r'"NumResults"\s*:\s*(\d+)')
+MEM_UNIT_MULTIPLIERS = {"": 1, "k": 2**10, "M": 2**20, "G": 2**30}
+
+# only this much of the end of stderr is shown when a run fails
+STDERR_TAIL_SIZE = 4096
+
+
+def iter_mtimes(path: str) -> t.Iterator[float]:
+    """
+    Yield the modification time of `path` and, if it is a directory, of
+    every file under it.
+    """
+    if not os.path.isdir(path):
+        yield os.stat(path).st_mtime
+        return
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_mtimes(entry.path)
+            else:
+                yield entry.stat().st_mtime
+
+
+def needs_rebuild(outputs: list[str], sources: list[str]) -> bool:
+    """
+    Check whether any of `sources` has been modified after the newest of
+    `outputs` was built.
+    """
+    if not all(os.path.exists(path) for path in outputs):
+        return True
+
+    def newest(paths: list[str]) -> float:
+        existing = [path for path in paths if os.path.exists(path)]
+        return max((mtime for path in existing for mtime in iter_mtimes(path)), default=0.0)
+
+    return newest(sources) > newest(outputs)
+
+
+def build_ipmes_plus(unoptimized_join=False):
+    """
+    Build IPMES+ into `IPMES_PLUS_BINARY`. With `unoptimized_join`, the join
+    layer optimization is disabled through the cargo feature of the same name
+    and the build goes to a separate target directory, so that both binaries
+    can coexist.
+    """
+    cmd = ["cargo", "build", "--release"]
+    binary = IPMES_PLUS_BINARY
+    if unoptimized_join:
+        cmd += ["--features", "unoptimized_join", "--target-dir", IPMES_PLUS_UNOPTIMIZED_TARGET]
+        binary = IPMES_PLUS_UNOPTIMIZED_BINARY
+
+    sources = [os.path.join(IPMES_PLUS, p) for p in ("src", "Cargo.toml", "Cargo.lock")]
+    if not needs_rebuild([binary], sources):
+        return
+
+    # sccache, when installed, lets the two builds of the join experiment
+    # share the compiled dependencies
+    env = os.environ
+    if "RUSTC_WRAPPER" not in env and shutil.which("sccache") is not None:
+        env = {**env, "RUSTC_WRAPPER": "sccache"}
     subprocess.run(
-        ["cargo", "build", "--release"],
+        cmd,
         check=True,
+        cwd=IPMES_PLUS,
+        env=env,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
-    os.chdir(cwd)
 
 
 def build_timing(clean=False):
-    cwd = os.getcwd()
-    os.chdir(TIMING)
+    # the binary lives inside the source tree, so comparing against the whole
+    # tree is fine: the binary can not be newer than itself
+    if not clean and not needs_rebuild([os.path.join(TIMING, "bin/tirdf")], [TIMING]):
+        return
+
     if clean:
         subprocess.run(
             ["make", "clean"],
             check=True,
+            cwd=TIMING,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
     subprocess.run(
-        ["make", "-j"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ["make", "-j"],
+        check=True,
+        cwd=TIMING,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
-    os.chdir(cwd)
 
 
 def build_ipmes():
-    cwd = os.getcwd()
-    os.chdir(IPMES + "/ipmes-java/")
+    outputs = [os.path.join(IPMES_JAVA, "target/classes"), IPMES_CLASSPATH_FILE]
+    sources = [os.path.join(IPMES_JAVA, p) for p in ("src", "pom.xml")]
+    if not needs_rebuild(outputs, sources):
+        return
+
+    # exec:help puts the exec plugin into the local repository, so that runs
+    # through maven can be offline. The dependency classpath is recorded so
+    # that run_ipmes can also start the JVM directly, see ipmes_command.
     subprocess.run(
-        ["mvn", "compile"],
+        [
+            "mvn",
+            "compile",
+            "exec:help",
+            "dependency:build-classpath",
+            "-Dmdep.outputFile=" + os.path.relpath(IPMES_CLASSPATH_FILE, IPMES_JAVA),
+        ],
         check=True,
+        cwd=IPMES_JAVA,
+        env=MAVEN_BUILD_ENV,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
-    os.chdir(cwd)
-
 
-def parse_peak_mem_result(peak_mem_result: re.Match[str] | None) -> int:
-    if peak_mem_result is not None:
-        peak_mem = peak_mem_result.group(1)
-        peak_mem_unit = peak_mem_result.group(2)
-
-        multiplier = 1
-        if peak_mem_unit == "k":
-            multiplier = 2**10
-        elif peak_mem_unit == "M":
-            multiplier = 2**20
-        elif peak_mem_unit == "G":
-            multiplier = 2**30
-        else:
-            print(f"Encounter unknown memory unit: {peak_mem_unit}")
-
-        return int(peak_mem) * multiplier
-    else:
-        return 0
 
+@functools.cache
+def ipmes_java_command() -> list[str]:
+    """
+    Returns:
+        The command that runs the main class of IPMES, which is read from the
+        `exec.mainClass` property or the `mainClass` of the exec plugin in its
+        pom.xml
+    """
+    main_class = None
+    for elem in ET.parse(IPMES_POM).iter():
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag in ("exec.mainClass", "mainClass") and elem.text:
+            main_class = elem.text.strip()
+            break
+    if main_class is None:
+        raise RuntimeError("Can not find the main class of IPMES in its pom.xml")
+
+    with open(IPMES_CLASSPATH_FILE) as f:
+        dependencies = f.read().strip()
+    classpath = os.path.join(IPMES_JAVA, "target/classes")
+    if dependencies:
+        classpath += os.pathsep + dependencies
+    return ["java", "-cp", classpath, main_class]
+
+
+def ipmes_command(args: list[str], direct_java=False) -> list[str]:
+    """
+    Returns:
+        The command that runs IPMES with `args`. By default IPMES is launched
+        through `mvn exec:java` as for the results in the paper, so the
+        measured CPU time and peak heap include maven. With `direct_java`,
+        the JVM is started without maven, which is faster but not comparable
+        with the paper.
+    """
+    if direct_java:
+        return [*ipmes_java_command(), *args]
+    return ["mvn", "-f", IPMES_POM, "-q", "-o", "exec:java", "-Dexec.args=" + shlex.join(args)]
+
+
+cpu_slots: t.Optional["queue.Queue[list[int]]"] = None
+
+# whether the stdout of measured runs is echoed to the terminal
+verbose = False
+
+
+def set_verbose(enabled: bool):
+    global verbose
+    verbose = enabled
+
+
+def init_cpu_slots(cores_per_job: int):
+    """
+    Split the CPUs available to this process into disjoint slots of
+    `cores_per_job` cores. While slots are initialized, every run is pinned
+    to a free slot for its whole duration with `taskset`.
+    """
+    global cpu_slots
+    cpus = sorted(os.sched_getaffinity(0))
+    cores_per_job = min(cores_per_job, len(cpus))
+    cpu_slots = queue.Queue()
+    for i in range(0, len(cpus) - cores_per_job + 1, cores_per_job):
+        cpu_slots.put(cpus[i : i + cores_per_job])
+
+
+@contextlib.contextmanager
+def pin_to_cpus(run_cmd: list[str]) -> t.Iterator[list[str]]:
+    """
+    Acquire a free CPU slot, if slots are initialized, and yield `run_cmd`
+    wrapped by `taskset` to run on that slot.
+    """
+    if cpu_slots is None:
+        yield run_cmd
+        return
+
+    cpus = cpu_slots.get()
+    try:
+        yield ["taskset", "-c", ",".join(map(str, cpus)), *run_cmd]
+    finally:
+        cpu_slots.put(cpus)
+
+
+@functools.cache
+def prewarm_file(path: str):
+    """
+    Ask the kernel to read `path` into the page cache ahead of its first
+    run, so that runs without warm-up do not pay for the cold read. This is
+    only a hint: a missing file is left for the run itself to report.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def spawn_silent(run_cmd: list[str]) -> int:
+    """
+    Run `run_cmd` with its stdout discarded and wait for it to exit.
+
+    This is used for warm-up runs whose output is never read, so no pipes
+    are set up and the child is started with posix_spawn instead of Popen.
+
+    Returns:
+        The exit code of the command
+    """
+    pid = os.posix_spawnp(
+        run_cmd[0],
+        run_cmd,
+        os.environ,
+        file_actions=[(os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0)],
+    )
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def wait_rusage(proc: Popen) -> resource.struct_rusage:
+    """
+    Wait for `proc` to exit and return the resources used by it and by the
+    descendants it has waited for. Unlike RUSAGE_CHILDREN, this only counts
+    `proc`, so it stays accurate when several runs are in flight.
+    """
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return usage
+
+
+def report_failure(run_cmd: list[str], errs: t.BinaryIO):
+    """
+    Print the last `STDERR_TAIL_SIZE` bytes of the stderr written to `errs`
+    by a failed run of `run_cmd`. JVM crashes can dump many MB of stack
+    traces, and printing all of them would stall the rest of the sweep.
+    """
+    size = errs.seek(0, os.SEEK_END)
+    errs.seek(max(0, size - STDERR_TAIL_SIZE))
+    tail = errs.read().decode(errors="replace")
+    if size > STDERR_TAIL_SIZE:
+        tail = f"... ({size - STDERR_TAIL_SIZE} bytes omitted)\n" + tail
+    print("Failed to run `{}`:\n{}".format(shlex.join(run_cmd), tail))
+
+
+def parse_peak_mem(peak_mem: str, peak_mem_unit: str) -> int:
+    if peak_mem_unit not in MEM_UNIT_MULTIPLIERS:
+        print(f"Encounter unknown memory unit: {peak_mem_unit}")
+    return int(peak_mem) * MEM_UNIT_MULTIPLIERS.get(peak_mem_unit, 1)
+
+
+def parse_summary_line(line: str, summary: dict):
+    """
+    Parse a line of the summary printed at the end of an IPMES+ or Timing
+    run, and record the found value into `summary`.
+    """
+    _, found, value = line.partition(NUM_MATCH_PREFIX)
+    if found:
+        summary["num_match"] = int(value.split()[0])
+        return
+
+    _, found, value = line.partition(CPU_TIME_PREFIX)
+    if found:
+        summary["cpu_time"] = float(value.split()[0])
+        return
+
+    _, found, value = line.partition(PEAK_MEM_PREFIX)
+    if found:
+        # a value printed without a unit is in bytes
+        parts = value.split()
+        unit = parts[1] if len(parts) > 1 else ""
+        summary["peak_mem"] = parse_peak_mem(parts[0], unit.removesuffix("B"))
+
+
+def parse_json_report_line(line: str, summary: dict):
+    """
+    Parse the summary printed by IPMES+ when it runs with `--json`. A null
+    peak memory, reported where IPMES+ can not measure it, is left unset.
+    """
+    if not line.startswith("{"):
+        return
+    report = json.loads(line)
+    summary["num_match"] = report["matches"]
+    summary["cpu_time"] = report["cpu_seconds"]
+    if report["peak_mem_bytes"] is not None:
+        summary["peak_mem"] = report["peak_mem_bytes"]
+
+
+def measure(
+    run_cmd: list[str],
+    pre_run=0,
+    re_run=1,
+    parse_line: t.Callable[[str, dict], None] = parse_summary_line,
+) -> t.Union[t.Tuple[int, float, int], None]:
+    """
+    Run `run_cmd` `pre_run` times for warm-up and `re_run` times for
+    measurement. The stdout of measured runs is read line by line and
+    passed to `parse_line`, so it is never buffered as a whole.
+
+    Returns:
+        (number of matches, average CPU time, peak memory of the last run),
+        or None if any measured run failed. The peak memory is 0 if the
+        program does not report it.
+    """
+    if re_run < 1:
+        print("Skipped: `{}`".format(" ".join(run_cmd)))
+        return 0, 0.0, 0
+
+    with pin_to_cpus(run_cmd) as run_cmd:
+        print("Running: `{}`".format(" ".join(run_cmd)))
+
+        for _ in range(pre_run):
+            spawn_silent(run_cmd)
+
+        summary = {}
+        total_cpu_time = 0.0
+        for i in range(re_run):
+            print(f"Run {i + 1} / {re_run} ...")
+            summary = {}
+            # stderr goes to a file so that a chatty child can not block on a
+            # full stderr pipe while we are reading its stdout
+            with tempfile.TemporaryFile() as errs:
+                proc = Popen(run_cmd, stdout=PIPE, stderr=errs, text=True, bufsize=1)
+                for line in proc.stdout:
+                    if verbose:
+                        print(line, end="")
+                    parse_line(line, summary)
+                proc.stdout.close()
+
+                # the peak memory is only taken from the program itself: the
+                # ru_maxrss of a child on Linux starts from the memory of this
+                # process at fork time, so it would report the harness instead
+                if proc.wait() != 0:
+                    report_failure(run_cmd, errs)
+                    return None
+
+            total_cpu_time += summary.get("cpu_time", 0.0)
 
+    avg_cpu_time = total_cpu_time / re_run
+    return summary.get("num_match", 0), avg_cpu_time, summary.get("peak_mem", 0)
+
+
+result_cache_file: t.Optional[str] = None
+result_cache: dict[str, list] = {}
+result_cache_lock = threading.Lock()
+
+
+def load_result_cache(path: str):
+    """
+    Enable memoization of run results in the json file at `path`, loading
+    the results recorded by previous invocations.
+    """
+    global result_cache_file, result_cache
+    result_cache_file = path
+    if os.path.exists(path):
+        with open(path) as f:
+            result_cache = json.load(f)
+
+
+def save_result_cache():
+    tmp_file = result_cache_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(result_cache, f, indent=2)
+    os.replace(tmp_file, result_cache_file)
+
+
+def disk_memoize(binary: str):
+    """
+    Memoize the results of a run function in the result cache, keyed by the
+    function arguments and the modification time of `binary`, so that a
+    rebuilt binary is measured again. If the function takes a `binary`
+    argument, the binary it is called with is used instead. The modification
+    times of the files passed as arguments, e.g. the pattern and the data
+    graph, are part of the key as well. Failed runs are not memoized.
+
+    This is a no-op unless `load_result_cache` has been called.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if result_cache_file is None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            run_binary = bound.arguments.get("binary", binary)
+            binary_mtime = max(iter_mtimes(run_binary)) if os.path.exists(run_binary) else 0.0
+            input_mtimes = [
+                os.path.getmtime(value)
+                for value in bound.arguments.values()
+                if isinstance(value, str) and os.path.isfile(value)
+            ]
+            key_src = json.dumps([func.__name__, bound.arguments, binary_mtime, input_mtimes])
+            key = hashlib.sha256(key_src.encode()).hexdigest()
+
+            with result_cache_lock:
+                if key in result_cache:
+                    print(f"Reusing the cached result of {func.__name__}{tuple(args)}")
+                    return tuple(result_cache[key])
+
+            res = func(*args, **kwargs)
+            if res is not None:
+                with result_cache_lock:
+                    result_cache[key] = list(res)
+                    save_result_cache()
+            return res
+
+        return wrapper
+
+    return decorator
+
+
+@disk_memoize(IPMES_PLUS_BINARY)
 def run_ipmes_plus(
-    pattern_file: str, data_graph: str, window_size: int, pre_run=0, re_run=1
+    pattern_file: str,
+    data_graph: str,
+    window_size: int,
+    pre_run=0,
+    re_run=1,
+    binary: str = IPMES_PLUS_BINARY,
 ) -> t.Union[t.Tuple[int, float, float], None]:
-    binary = os.path.join(IPMES_PLUS, "target/release/ipmes-rust")
     run_cmd = [binary, pattern_file, data_graph, "-w", str(window_size), "--silent"]
-    print("Running: `{}`".format(" ".join(run_cmd)))
-
-    for _ in range(pre_run):
-        proc = Popen(run_cmd, stdout=None, stderr=None, encoding="utf-8")
-        proc.wait()
-
-    num_match = "0"
-    peak_mem_result = None
-    total_cpu_time = 0.0
-    for i in range(re_run):
-        print(f"Run {i + 1} / {re_run} ...")
-        proc = Popen(run_cmd, stdout=PIPE, stderr=PIPE, encoding="utf-8")
-        outs, errs = proc.communicate()
-        if proc.wait() != 0:
-            print("Failed to run `{}`:\n{}".format(" ".join(run_cmd), errs))
-            return None
-
-        print(outs)
-
-        num_match = re.search(r"Total number of matches: (\d+)", outs).group(1)
-        cpu_time = re.search(r"CPU time elapsed: (\d+\.?\d+) secs", outs).group(1)
-        total_cpu_time += float(cpu_time)
-        peak_mem_result = re.search(r"Peak memory usage: (\d+) (.)B", outs)
-
-    avg_cpu_time = total_cpu_time / re_run
-    num_match = int(num_match)
-    peak_mem = parse_peak_mem_result(peak_mem_result)
-    return num_match, avg_cpu_time, peak_mem
+    if pre_run == 0:
+        prewarm_file(data_graph)
+    return measure(run_cmd, pre_run, re_run)
 
 
+@disk_memoize(os.path.join(TIMING, "bin/tirdf"))
 def run_timing(
     pattern_file: str,
     data_graph: str,
@@ -139,36 +539,12 @@ def run_timing(
         runtime_record,
         subpattern_file,
     ]
-    print("Running: `{}`".format(" ".join(run_cmd)))
-
-    for _ in range(pre_run):
-        proc = Popen(run_cmd, stdout=None, stderr=None, encoding="utf-8")
-        proc.wait()
-
-    num_match = "0"
-    peak_mem_result = None
-    total_cpu_time = 0.0
-    for i in range(re_run):
-        print(f"Run {i + 1} / {re_run} ...")
-        proc = Popen(run_cmd, stdout=PIPE, stderr=PIPE, encoding="utf-8")
-        outs, errs = proc.communicate()
-        if proc.wait() != 0:
-            print("Failed to run `{}`:\n{}".format(" ".join(run_cmd), errs))
-            return None
-
-        print(outs)
-
-        num_match = re.search(r"Total number of matches: (\d+)", outs).group(1)
-        cpu_time = re.search(r"CPU time elapsed: (\d+\.?\d+) secs", outs).group(1)
-        total_cpu_time += float(cpu_time)
-        peak_mem_result = re.search(r"Peak memory usage: (\d+) (.)B", outs)
-
-    avg_cpu_time = total_cpu_time / re_run
-    num_match = int(num_match)
-    peak_mem = parse_peak_mem_result(peak_mem_result)
-    return num_match, avg_cpu_time, peak_mem
+    if pre_run == 0:
+        prewarm_file(data_graph)
+    return measure(run_cmd, pre_run, re_run)
 
 
+@disk_memoize(os.path.join(IPMES_JAVA, "target/classes"))
 def run_ipmes(
     pattern_path: str,
     graph_path: str,
@@ -176,50 +552,58 @@ def run_ipmes(
     pre_run=0,
     re_run=1,
     options: str = "",
+    direct_java=False,
 ) -> t.Union[t.Tuple[int, float, float], None]:
 
-    def parse_cpu_time(stderr: str) -> float:
-        lines = stderr.strip().split("\n")
-        user_time = float(lines[-2].split()[1])
-        sys_time = float(lines[-1].split()[1])
-        return user_time + sys_time
-
-    ipmes_pom = os.path.join(IPMES, "ipmes-java/pom.xml")
-    run_cmd = [
-        "bash",
-        "-c",
-        f'time -p -- mvn -f {ipmes_pom} -q exec:java -Dexec.args="-w {window_size} {pattern_path} {graph_path} {options}"',
-    ]
+    run_cmd = ipmes_command(
+        ["-w", str(window_size), pattern_path, graph_path, *options.split()],
+        direct_java,
+    )
     if re_run > 1:
-        print(f"Running ({re_run} times):", " ".join(run_cmd))
+        print(f"Running ({re_run} times):", shlex.join(run_cmd))
     else:
-        print("Running:", " ".join(run_cmd))
+        print("Running:", shlex.join(run_cmd))
         if re_run < 1:
             return 0, 0, 0
 
-    for _ in range(pre_run):
-        proc = Popen(run_cmd, stdout=None, stderr=None, encoding="utf-8")
-        proc.wait()
-
-    num_result = 0
-    total_cpu_time = 0
-    total_mem_usage = 0
-    for _ in range(re_run):
-        proc = Popen(run_cmd, stdout=PIPE, stderr=PIPE, encoding="utf-8")
-        outs, errs = proc.communicate()
-        if proc.wait() != 0:
-            print("Failed to run `{}`:\n{}".format(" ".join(run_cmd), errs))
-            return None
+    if pre_run == 0:
+        prewarm_file(graph_path)
+
+    with pin_to_cpus(run_cmd) as run_cmd:
+        for _ in range(pre_run):
+            spawn_silent(run_cmd)
+
+        num_result = 0
+        total_cpu_time = 0
+        total_mem_usage = 0
+        for _ in range(re_run):
+            # only the two fields are extracted, so that anything else IPMES
+            # prints does not have to be parsed, or even be valid JSON. The
+            # output is scanned line by line and never buffered as a whole.
+            peak_heap = None
+            num_results = None
+            with tempfile.TemporaryFile() as errs:
+                proc = Popen(run_cmd, stdout=PIPE, stderr=errs, text=True)
+                for line in proc.stdout:
+                    if verbose:
+                        print(line, end="")
+                    peak_heap = PEAK_HEAP_PATTERN.search(line) or peak_heap
+                    num_results = NUM_RESULTS_PATTERN.search(line) or num_results
+                proc.stdout.close()
+                usage = wait_rusage(proc)
+                if proc.returncode != 0:
+                    report_failure(run_cmd, errs)
+                    return None
+
+            cpu_time = usage.ru_utime + usage.ru_stime
+            if peak_heap is None or num_results is None:
+                print("Can not find the summary in the output of `{}`".format(shlex.join(run_cmd)))
+                return None
+            mem_usage = int(peak_heap[1])
+            num_result = int(num_results[1])
 
-        print(outs)
-
-        cpu_time = parse_cpu_time(errs)
-        output = json.loads(outs)
-        mem_usage = int(output["PeakHeapSize"])
-        num_result = int(output["NumResults"])
-
-        total_cpu_time += cpu_time
-        total_mem_usage += mem_usage
+            total_cpu_time += cpu_time
+            total_mem_usage += mem_usage
 
     return num_result, total_cpu_time / re_run, total_mem_usage / re_run
 
@@ -230,6 +614,7 @@ def run_siddhi(
     window_size: int,
     pre_run=0,
     re_run=1,
+    direct_java=False,
 ) -> t.Union[t.Tuple[int, float, float], None]:
     return run_ipmes(
         pattern_path,
@@ -238,79 +623,120 @@ def run_siddhi(
         options="--cep",
         pre_run=pre_run,
         re_run=re_run,
+        direct_java=direct_java,
     )
 
 
+def get_pattern_name(pattern_file: str) -> str:
+    return pattern_file.removesuffix(".json").removesuffix("_regex")
+
+
 def get_pattern_number(pattern_name: str):
-    pattern_name = pattern_name.removesuffix(".json").removesuffix("_regex")
-    return int(pattern_name[2:])
+    return int(get_pattern_name(pattern_name)[2:])
+
+
+def new_result_table(name_column: str, num_column: str) -> dict[str, list]:
+    """
+    Returns:
+        An empty table of run results, stored as one list per column
+    """
+    return {name_column: [], num_column: [], "CPU Time (sec)": [], "Peak Memory (MB)": []}
+
+
+def add_result(table: dict[str, list], name: str, res: t.Union[t.Tuple[int, float, float], None]):
+    """
+    Append the result `res` of a run to `table`, unless the run failed.
+    """
+    if res is None:
+        return
+    num_match, cpu_time, peak_mem = res
+    for column, value in zip(table.values(), (name, num_match, cpu_time, peak_mem / 2**20)):
+        column.append(value)
+
+
+def run_ipmes_plus_parallel(
+    runs: list[t.Tuple[str, str, int]], pre_run=0, re_run=1, parallel_jobs=1
+) -> list[t.Union[t.Tuple[int, float, float], None]]:
+    """
+    Run IPMES+ for every (pattern file, data graph, window size) in `runs`,
+    at most `parallel_jobs` at a time.
+
+    Returns:
+        The results of the runs, in the same order as `runs`
+    """
+    job_sem = asyncio.BoundedSemaphore(parallel_jobs)
 
+    async def run(pattern_file, data_graph, window_size):
+        async with job_sem:
+            return await asyncio.to_thread(
+                run_ipmes_plus, pattern_file, data_graph, window_size, pre_run, re_run
+            )
 
-def exp_freq_effectivess(pre_run=0, re_run=1) -> pd.DataFrame:
-    freq_patterns = os.listdir(os.path.join(IPMES_PLUS, "data/freq_patterns/"))
-    freq_patterns.sort(key=lambda p: get_pattern_number(p))
+    async def await_results():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=parallel_jobs))
+        return await asyncio.gather(*(run(*r) for r in runs))
 
-    original_result = []
-    freq_result = []
+    return asyncio.run(await_results())
 
+
+def exp_freq_effectivess(pre_run=0, re_run=1, parallel_jobs=1) -> "pd.DataFrame":
+    import pandas as pd
+
+    # (name, file name) pairs, so that every name is derived only once
+    with os.scandir(FREQ_PATTERN_DIR) as entries:
+        freq_patterns = [
+            (get_pattern_name(e.name), e.name)
+            for e in entries
+            if e.is_file() and e.name.endswith(".json")
+        ]
+    freq_patterns.sort(key=lambda p: get_pattern_number(p[0]))
+
+    original_result = new_result_table("Pattern", "Found Ins.")
+    freq_result = new_result_table("Pattern", "Found Ins.")
+
+    # the original and the frequency-type version of each pattern, in pairs
     data_graph = os.path.join(DATA_GRAPH_DIR, "attack_raw.csv")
-    for pattern in freq_patterns:
-        pattern_name = pattern.removesuffix(".json").removesuffix("_regex")
-
-        original_pattern = os.path.join(IPMES_PLUS, "data/universal_patterns/", pattern)
-        original_res = run_ipmes_plus(original_pattern, data_graph, 1800, pre_run, re_run)
-        if not original_res is None:
-            num_match, cpu_time, peak_mem = original_res
-            original_result.append(
-                [pattern_name, num_match, cpu_time, peak_mem / 2**20]
-            )
+    runs = []
+    for pattern_name, pattern in freq_patterns:
+        window_size = WINDOW_SIZES[pattern_name[:2]]
+        original_pattern = PATTERN_DIR + pattern
+        freq_pattern = FREQ_PATTERN_DIR + pattern
+        runs.append((original_pattern, data_graph, window_size))
+        runs.append((freq_pattern, data_graph, window_size))
 
-        freq_pattern = os.path.join(IPMES_PLUS, "data/freq_patterns/", pattern)
-        freq_res = run_ipmes_plus(freq_pattern, data_graph, 1800, pre_run, re_run)
-        if not freq_res is None:
-            num_match, cpu_time, peak_mem = freq_res
-            freq_result.append(
-                [pattern_name + "_freq", num_match, cpu_time, peak_mem / 2**20]
-            )
+    results = run_ipmes_plus_parallel(runs, pre_run, re_run, parallel_jobs)
+    for i, (pattern_name, _) in enumerate(freq_patterns):
+        add_result(original_result, pattern_name, results[2 * i])
+        add_result(freq_result, pattern_name + "_freq", results[2 * i + 1])
+
+    return pd.DataFrame({col: original_result[col] + freq_result[col] for col in original_result})
 
-    run_result = original_result + freq_result
-    return pd.DataFrame(
-        data=run_result,
-        columns=["Pattern", "Found Ins.", "CPU Time (sec)", "Peak Memory (MB)"],
-    )
 
+def exp_flow_effectivess(pre_run=0, re_run=1, parallel_jobs=1) -> "pd.DataFrame":
+    import pandas as pd
 
-def exp_flow_effectivess(pre_run=0, re_run=1) -> pd.DataFrame:
-    flow_configs = [("SP3", "attack.csv", 1800), ("DP3", "dd3.csv", 1000)]
+    flow_configs = [("SP3", "attack.csv"), ("DP3", "dd3.csv")]
 
-    original_result = []
-    flow_result = []
+    original_result = new_result_table("Pattern", "Found Ins.")
+    flow_result = new_result_table("Pattern", "Found Ins.")
 
-    for pattern, data_graph, window_size in flow_configs:
+    # the original and the flow-type version of each pattern, in pairs
+    runs = []
+    for pattern, data_graph in flow_configs:
+        window_size = WINDOW_SIZES[pattern[:2]]
         data_graph = os.path.join(FLOW_DATA_GRAPH_DIR, data_graph)
-        original_pattern = os.path.join(
-            IPMES_PLUS, "data/universal_patterns/", pattern + ".json"
-        )
-        original_res = run_ipmes_plus(original_pattern, data_graph, window_size, pre_run, re_run)
-        if not original_res is None:
-            num_match, cpu_time, peak_mem = original_res
-            original_result.append([pattern, num_match, cpu_time, peak_mem / 2**20])
+        original_pattern = f"{PATTERN_DIR}{pattern}.json"
+        flow_pattern = f"{FLOW_PATTERN_DIR}{pattern}.json"
+        runs.append((original_pattern, data_graph, window_size))
+        runs.append((flow_pattern, data_graph, window_size))
 
-        flow_pattern = os.path.join(
-            IPMES_PLUS, "data/flow_patterns/", pattern + ".json"
-        )
-        flow_res = run_ipmes_plus(flow_pattern, data_graph, window_size, pre_run, re_run)
-        if not flow_res is None:
-            num_match, cpu_time, peak_mem = flow_res
-            flow_result.append(
-                [pattern + "_flow", num_match, cpu_time, peak_mem / 2**20]
-            )
+    results = run_ipmes_plus_parallel(runs, pre_run, re_run, parallel_jobs)
+    for i, (pattern, _) in enumerate(flow_configs):
+        add_result(original_result, pattern, results[2 * i])
+        add_result(flow_result, pattern + "_flow", results[2 * i + 1])
 
-    run_result = original_result + flow_result
-    return pd.DataFrame(
-        data=run_result,
-        columns=["Pattern", "Found Ins.", "CPU Time (sec)", "Peak Memory (MB)"],
-    )
+    return pd.DataFrame({col: original_result[col] + flow_result[col] for col in original_result})
 
 
 async def run_all_patterns(
@@ -320,32 +746,34 @@ async def run_all_patterns(
     job_sem: asyncio.BoundedSemaphore,
     pre_run=0,
     re_run=1,
+    ipmes_direct_java=False,
 ) -> t.Tuple[float, float]:
     run_function_map = {
-        "ipmes": run_ipmes,
+        "ipmes": functools.partial(run_ipmes, direct_java=ipmes_direct_java),
         "ipmes+": run_ipmes_plus,
-        "siddhi": run_siddhi,
+        "siddhi": functools.partial(run_siddhi, direct_java=ipmes_direct_java),
         "timing": run_timing,
     }
+    run_func = run_function_map[app]
 
     data_graph_dir = OLD_DATA_GRAPH_DIR
     if app == "ipmes+":
         data_graph_dir = DATA_GRAPH_DIR
-    data_graph = os.path.join(data_graph_dir, data_graph + ".csv")
+    data_graph = f"{data_graph_dir}{data_graph}.csv"
 
     pattern_dir = OLD_PATTERN_DIR
     if app == "ipmes+":
         pattern_dir = PATTERN_DIR
+    pattern_files = {p: f"{pattern_dir}{p}_regex.json" for p in patterns}
+    window_sizes = {p: WINDOW_SIZES[p[:2]] for p in patterns}
 
     async def run(pattern):
         async with job_sem:
-            pattern_file = os.path.join(pattern_dir, pattern + "_regex.json")
-            window_size = 1800 if pattern.startswith("SP") else 1000
             thread = asyncio.to_thread(
-                run_function_map[app],
-                pattern_file,
+                run_func,
+                pattern_files[pattern],
                 data_graph,
-                window_size,
+                window_sizes[pattern],
                 pre_run,
                 re_run,
             )
@@ -357,17 +785,14 @@ async def run_all_patterns(
             continue  # a know bug of timing: it failed to run DP1 pattern on all graph
         results.append(run(pattern))
 
-    total_cpu_time = 0.0
-    total_mem_usage = 0.0
-    success_runs = 0
-    for res in await asyncio.gather(*results):
-        if not res is None:
-            num_match, cpu_time, peak_mem = res
-            total_cpu_time += cpu_time
-            total_mem_usage += peak_mem / 2**20
-            success_runs += 1
+    succeeded = [res for res in await asyncio.gather(*results) if not res is None]
+    if not succeeded:
+        print(f"Every run of {app} on {data_graph} failed")
+        return math.nan, math.nan
 
-    return total_cpu_time / success_runs, total_mem_usage / success_runs
+    avg_cpu_time = statistics.fmean(cpu_time for _, cpu_time, _ in succeeded)
+    avg_mem_usage = statistics.fmean(peak_mem for _, _, peak_mem in succeeded) / 2**20
+    return avg_cpu_time, avg_mem_usage
 
 
 def exp_matching_efficiency(
@@ -375,8 +800,11 @@ def exp_matching_efficiency(
     graphs: list[str],
     pre_run=0,
     re_run=1,
-    parallel_jobs=1
-) -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    parallel_jobs=1,
+    ipmes_direct_java=False,
+) -> t.Tuple["pd.DataFrame", "pd.DataFrame"]:
+    import pandas as pd
+
     spade_graphs = ["attack", "mix", "benign"]
     spade_patterns = [f"SP{i}" for i in range(1, 13)]
     darpa_graphs = ["dd1", "dd2", "dd3", "dd4"]
@@ -384,44 +812,56 @@ def exp_matching_efficiency(
 
     job_sem = asyncio.BoundedSemaphore(parallel_jobs)
 
+    datasets = []
     all_results = []
 
+    # Each (dataset, app) result is appended to this file as soon as it is
+    # ready, so that the finished ones survive a crash in the middle of the
+    # experiment. The tables are only built once everything is done.
+    progress_file = os.path.join(OUT_DIR, "efficiency_progress.csv")
+    progress = open(progress_file, "w", newline="")
+    progress_writer = csv.writer(progress)
+    progress_writer.writerow(["Dataset", "App", "CPU Time (sec)", "Peak Memory (MB)"])
+
+    async def run_and_record(app, graph, patterns):
+        res = await run_all_patterns(
+            app, graph, patterns, job_sem, pre_run, re_run, ipmes_direct_java
+        )
+        progress_writer.writerow([graph, app, *res])
+        progress.flush()
+        return res
+
     def run_dataset(dataset, patterns):
         for graph in dataset:
             if not graph in graphs:
                 continue
+            datasets.append(graph)
             for app in apps:
-                all_results.append(
-                    run_all_patterns(
-                        app, graph, patterns, job_sem, pre_run, re_run
-                    )
-                )
+                all_results.append(run_and_record(app, graph, patterns))
 
     async def await_results():
+        # asyncio.to_thread runs on the default executor, which is capped at
+        # min(32, cpu_count + 4) threads, so it is sized for `parallel_jobs`
+        # runs instead
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=parallel_jobs))
         return await asyncio.gather(*all_results)
 
     run_dataset(spade_graphs, spade_patterns)
     run_dataset(darpa_graphs, darpa_patterns)
 
-    datasets = spade_graphs + darpa_graphs
-    cpu_result = []
-    mem_result = []
-    for i, (cpu_time, peak_mem) in enumerate(asyncio.run(await_results())):
-        if i % len(apps) == 0:
-            dataset_id = i // len(apps)
-            cpu_result.append([datasets[dataset_id]])
-            mem_result.append([datasets[dataset_id]])
-        cpu_result[-1].append(cpu_time)
-        mem_result[-1].append(peak_mem)
-
-    cpu_df = pd.DataFrame(
-        data=cpu_result,
-        columns=["Dataset", *apps],
-    )
-    mem_df = pd.DataFrame(
-        data=mem_result,
-        columns=["Dataset", *apps],
-    )
+    # one column per app, in the same order as `datasets`
+    cpu_times = {app: [] for app in apps}
+    mem_usages = {app: [] for app in apps}
+    with progress:
+        results = asyncio.run(await_results())
+    for i, (cpu_time, peak_mem) in enumerate(results):
+        app = apps[i % len(apps)]
+        cpu_times[app].append(cpu_time)
+        mem_usages[app].append(peak_mem)
+
+    cpu_df = pd.DataFrame({"Dataset": datasets, **cpu_times})
+    mem_df = pd.DataFrame({"Dataset": datasets, **mem_usages})
     return cpu_df, mem_df
 
 
@@ -430,56 +870,39 @@ def exp_join_layer_optimization(
     re_run=1,
     num_instaces: list[int] = [10, 20, 30, 40, 50]
 ):
-    with open("patches/forward.patch", "r") as f:
-        subprocess.run(["patch"], check=True, stdout=None, stderr=None, stdin=f, cwd=IPMES_PLUS + "src/process_layers/join_layer/")
+    import pandas as pd
 
-    build_ipmes_plus()
-
-    run_result = []
-    for n_ins in num_instaces:
-        pattern = os.path.join(PATTERN_DIR, f"SP6_regex.json")
-        data_graph = os.path.join(SYNTH_GRAPH_DIR, f"DW{n_ins}.csv")
-        res = run_ipmes_plus(pattern, data_graph, 1800, pre_run, re_run)
-        if not res is None:
-            num_match, cpu_time, peak_mem = res
-            run_result.append([f"DW{n_ins}", num_match, cpu_time, peak_mem / 2**20])
-
-    df = pd.DataFrame(
-        data=run_result,
-        columns=[
-            "Synthesized Graph",
-            "Num Results",
-            "CPU Time (sec)",
-            "Peak Memory (MB)",
-        ],
-    )
+    pattern = os.path.join(PATTERN_DIR, "SP6_regex.json")
+    window_size = WINDOW_SIZES["SP"]
+    data_graphs = [
+        (f"DW{n_ins}", os.path.join(SYNTH_GRAPH_DIR, f"DW{n_ins}.csv"))
+        for n_ins in num_instaces
+    ]
 
-    with open("patches/backward.patch", "r") as f:
-        subprocess.run(["patch"], check=True, stdout=None, stderr=None, stdin=f, cwd=IPMES_PLUS + "src/process_layers/join_layer/")
+    if re_run < 1:
+        # nothing would be measured, so the source tree is left untouched
+        empty = new_result_table("Synthesized Graph", "Num Results")
+        return pd.DataFrame(empty), pd.DataFrame(empty)
 
+    # the unoptimized join layer is selected by a cargo feature, so the source
+    # tree is never modified and both binaries stay cached across runs
+    build_ipmes_plus(unoptimized_join=True)
     build_ipmes_plus()
 
-    optimized_run_result = []
-    for n_ins in num_instaces:
-        pattern = os.path.join(PATTERN_DIR, f"SP6_regex.json")
-        data_graph = os.path.join(SYNTH_GRAPH_DIR, f"DW{n_ins}.csv")
-        res = run_ipmes_plus(pattern, data_graph, 1800, pre_run, re_run)
-        if not res is None:
-            num_match, cpu_time, peak_mem = res
-            optimized_run_result.append(
-                [f"DW{n_ins}", num_match, cpu_time, peak_mem / 2**20]
-            )
+    run_result = new_result_table("Synthesized Graph", "Num Results")
+    for graph_name, data_graph in data_graphs:
+        res = run_ipmes_plus(
+            pattern, data_graph, window_size, pre_run, re_run, IPMES_PLUS_UNOPTIMIZED_BINARY
+        )
+        add_result(run_result, graph_name, res)
 
-    df_optimized = pd.DataFrame(
-        data=optimized_run_result,
-        columns=[
-            "Synthesized Graph",
-            "Num Results",
-            "CPU Time (sec)",
-            "Peak Memory (MB)",
-        ],
-    )
+    optimized_run_result = new_result_table("Synthesized Graph", "Num Results")
+    for graph_name, data_graph in data_graphs:
+        res = run_ipmes_plus(pattern, data_graph, window_size, pre_run, re_run)
+        add_result(optimized_run_result, graph_name, res)
 
+    df = pd.DataFrame(run_result)
+    df_optimized = pd.DataFrame(optimized_run_result)
     return df, df_optimized
 
 
@@ -516,7 +939,7 @@ def select_list(title: str, msg: str, choices: list[str]) -> list[str]:
     return chosen
 
 
-def save_table(df: pd.DataFrame, filename: str):
+def save_table(df: "pd.DataFrame", filename: str):
     path = os.path.join(OUT_DIR, filename)
     print(df.to_string(index=False))
     df.to_csv(path, index=False)
@@ -541,10 +964,36 @@ def main():
         type=int,
         help="Number of runs before actual measurement.",
     )
+    parser.add_argument(
+        "--cache-file",
+        default=None,
+        type=str,
+        help="Reuse the results of identical runs recorded in this json file, and record new ones into it.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        default=False,
+        action="store_true",
+        help="Print the output of every measured run.",
+    )
     subparsers = parser.add_subparsers(dest='exp_name', required=True, help='Experiment to run')
 
-    subparsers.add_parser('freq', help='Effectiveness of Frequency-type Event Patterns')
-    subparsers.add_parser('flow', help='Effectiveness of Flow-type Event Patterns')
+    parser_freq = subparsers.add_parser(
+        'freq',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        help='Effectiveness of Frequency-type Event Patterns')
+    parser_flow = subparsers.add_parser(
+        'flow',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        help='Effectiveness of Flow-type Event Patterns')
+    for subparser in (parser_freq, parser_flow):
+        subparser.add_argument(
+            "-j", "--jobs",
+            default=1,
+            type=int,
+            help="The number of parallel jobs"
+        )
 
     parser_effi = subparsers.add_parser(
         'efficiency',
@@ -558,6 +1007,19 @@ def main():
     )
     all_apps = ['ipmes+', 'timing', 'ipmes', 'siddhi']
     all_datasets = ['attack', 'mix', 'benign', 'dd1', 'dd2', 'dd3', 'dd4']
+    parser_effi.add_argument(
+        "--cores-per-job",
+        default=0,
+        type=int,
+        help="Pin each job to this many dedicated CPU cores, 0 to disable pinning",
+    )
+    parser_effi.add_argument(
+        "--ipmes-direct-java",
+        default=False,
+        action="store_true",
+        help="Start IPMES and Siddhi with java directly instead of through maven. "
+        "Faster, but their CPU time and peak heap then exclude maven, unlike in the paper",
+    )
     parser_effi.add_argument(
         "--apps",
         choices=all_apps,
@@ -574,20 +1036,42 @@ def main():
     subparsers.add_parser('join', help='Join Layer Optimization')
 
     args = parser.parse_args()
+    set_verbose(args.verbose)
 
+    apps = []
+    graphs = []
+    if args.exp_name == 'efficiency':
+        if args.apps is None:
+            apps = select_list("Apps:", "Select apps to run", all_apps)
+        else:
+            apps = args.apps
+
+        if args.graphs is None:
+            graphs = select_list("Datasets:", "Select datasets to run", all_datasets)
+        else:
+            graphs = args.graphs
+
+    # only the applications used by the experiment are built, and the join
+    # experiment builds both versions of IPMES+ by itself
     print("*** Building applications... ***")
-    build_ipmes()
-    build_ipmes_plus()
-    build_timing()
+    if "ipmes" in apps or "siddhi" in apps:
+        build_ipmes()
+    if args.exp_name in ('freq', 'flow') or "ipmes+" in apps:
+        build_ipmes_plus()
+    if "timing" in apps:
+        build_timing()
     print("*** Building finished. ***")
 
     os.makedirs(OUT_DIR, exist_ok=True)
 
+    if args.cache_file is not None:
+        load_result_cache(args.cache_file)
+
     if args.exp_name == 'freq':
-        save_table(exp_freq_effectivess(args.pre_run, args.re_run), "freq_result.csv")
+        save_table(exp_freq_effectivess(args.pre_run, args.re_run, args.jobs), "freq_result.csv")
 
     if args.exp_name == 'flow':
-        save_table(exp_flow_effectivess(args.pre_run, args.re_run), "flow_result.csv")
+        save_table(exp_flow_effectivess(args.pre_run, args.re_run, args.jobs), "flow_result.csv")
 
     if args.exp_name == 'join':
         df, df_optimized = exp_join_layer_optimization(args.pre_run, args.re_run)
@@ -598,15 +1082,8 @@ def main():
         save_table(df_optimized, "join_optim_after.csv")
 
     if args.exp_name == 'efficiency':
-        if args.apps is None:
-            apps = select_list("Apps:", "Select apps to run", all_apps)
-        else:
-            apps = args.apps
-
-        if args.graphs is None:
-            graphs = select_list("Datasets:", "Select datasets to run", all_datasets)
-        else:
-            graphs = args.graphs
+        if args.cores_per_job > 0:
+            init_cpu_slots(args.cores_per_job)
 
         cpu_df, mem_df = exp_matching_efficiency(
             apps,
@@ -614,6 +1091,7 @@ def main():
             args.pre_run,
             args.re_run,
             args.jobs,
+            args.ipmes_direct_java,
         )
 
         print("Average CPU Time (sec)")
@@ -1,3 +1,8 @@
+import asyncio
+import functools
+from collections import Counter
+from collections.abc import Container
+import mmap
 import os
 import re
 import subprocess
@@ -29,120 +34,140 @@ data_name_mapping = {
     # TODO: DDx
 }
 
+BINARY = './target/release/ipmes-rust'
+
 # data graph format
 EVENT_ID_FIELD = 2
 SUBJECT_ID_FIELD = 4
 OBJECT_ID_FIELD = 6
 
+# maximum length of a line read from the matcher's stdout
+MAX_LINE_LENGTH = 1 << 20
+
+ANS_PATTERN = re.compile(r'<.*>\[([0-9,]*)\]')
+NUM_RESULTS_PATTERN = re.compile(rb'Total number of matches: (\d+)')
+MATCH_PATTERN = re.compile(rb'Pattern Match: <[0-9\.]+, [0-9\.]+>\[([0-9,\s]+)\]')
+# a line of the data graph, capturing its event id; lines whose event id is
+# not a number, such as a header, are skipped
+DATA_EDGE_PATTERN = re.compile(rb'^(?:[^,\n]*,){%d}(\d+),[^\n]*\n?' % EVENT_ID_FIELD, re.MULTILINE)
+
+default_windows = {
+    key: '1800s' if key.startswith('SP') else '1000s'
+    for key in pattern_name_mapping
+}
+
+@functools.cache
 def to_ans_file(pattern_name: str) -> str:
     key = pattern_name.removesuffix('_regex')
     old_pattern_name = pattern_name_mapping[key]
     complete_pattern_name = pattern_name.replace(key, old_pattern_name)
-    default_window = '1800s' if pattern.startswith('SP') else '1000s'
-    return f'{complete_pattern_name}_{default_window}.txt'
+    return f'{complete_pattern_name}_{default_windows[key]}.txt'
 
 def get_ans_file(ans_dir: str, pattern: str, data_graph: str) -> str:
     return os.path.join(ans_dir, data_name_mapping[data_graph], to_ans_file(pattern))
 
-def parse_ans_file(file_path: str) -> list[list[str]]:
+def parse_ids(ids: str | bytes, sep: str | bytes) -> tuple[int, ...]:
+    return tuple(int(x) for x in ids.split(sep) if x)
+
+def parse_ans_file(file_path: str) -> list[tuple[int, ...]]:
     with open(file_path) as f:
-        lines = f.readlines()
-    
-    ans_pattern = re.compile(r'<.*>\[([0-9,]*)\]')
-    answers = []
-    for line in lines:
-        result = ans_pattern.search(line)
-        if result is None:
-            continue
-        ans = result.group(1)
-        answers.append(ans.split(','))
-    return answers
+        content = f.read()
 
-def index_data_graph(data_graph: str) -> dict[int, tuple[int, str]]:
-    with open(data_graph) as f:
-        lines = f.readlines()
-    
-    data_edges = {}
-    for ln, line in enumerate(lines):
-        fields = line.split(',')
-        if len(fields) < 4:
-            continue
-        event_id = fields[EVENT_ID_FIELD]
-        data_edges[event_id] = (ln, line)
+    return [parse_ids(found.group(1), ',') for found in ANS_PATTERN.finditer(content)]
+
+def index_data_graph(data_graph: mmap.mmap) -> dict[int, int]:
+    """
+    Map each event id to the byte offset of the line containing that event
+    in the data graph. Lines are split by the regex engine, so the whole
+    scan runs in C. Only the offset is kept per event, the end of the line
+    is found again by `read_line` for the few events that are read back.
+    """
+    return {int(found.group(1)): found.start() for found in DATA_EDGE_PATTERN.finditer(data_graph)}
 
-    return data_edges
+def read_line(data_graph: mmap.mmap, offset: int) -> str:
+    end = data_graph.find(b'\n', offset) + 1
+    if end == 0:
+        end = len(data_graph)
+    return data_graph[offset:end].decode()
 
 def get_num_results_from_stdout(stdout: bytes) -> int:
-    stdout = stdout.decode()
-    match_result = re.search(r'Total number of matches: (\d+)', stdout)
+    match_result = NUM_RESULTS_PATTERN.search(stdout)
     if match_result is None:
         return 0
     
     return int(match_result.group(1))
 
-def get_match_results_from_stdout(stdout: bytes):
-    lines = stdout.decode().split('\n')
-    ans_pattern = re.compile(r'Pattern Match: <[0-9\.]+, [0-9\.]+>\[([0-9,\s]+)\]')
-    match_results = []
-    for line in lines:
-        found = ans_pattern.search(line)
-        if found is None:
-            continue
-        ids = found.group(1).split(', ')
-        match_results.append(ids)
+def get_match_results_from_stdout(stdout: bytes) -> list[tuple[int, ...]]:
+    return [parse_ids(found.group(1), b', ') for found in MATCH_PATTERN.finditer(stdout)]
+
+async def run_matcher(run_args: list[str], answers: Container[tuple[int, ...]] | None = None) -> list[tuple[int, ...]]:
+    """
+    Run the matcher and collect the match results while it is still running,
+    so that its stdout is never buffered as a whole.
 
+    If `answers` is given, the matcher is terminated at the first match
+    result not in `answers`, which is then the last collected result.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *run_args,
+        stdout=asyncio.subprocess.PIPE,
+        limit=MAX_LINE_LENGTH,
+    )
+
+    match_results = []
+    async for line in proc.stdout:
+        found = MATCH_PATTERN.search(line)
+        if found is not None:
+            match_results.append(parse_ids(found.group(1), b', '))
+            if answers is not None and match_results[-1] not in answers:
+                proc.terminate()
+                break
+
+    await proc.wait()
     return match_results
 
-def find_wrong_answers(answers: list[list[str]], match_results: list[list[str]]):
-    ans_dict = {}
-    for ans_ids in answers:
-        ans_dict[','.join(ans_ids)] = 0
-    
-    false_positive = []
-    for match_ids in match_results:
-        key = ','.join(match_ids)
-        if key not in ans_dict:
-            false_positive.append(key)
-            continue
-        ans_dict[key] += 1
-    
+def find_wrong_answers(answers: list[tuple[int, ...]], match_results: list[tuple[int, ...]]):
+    # dict.fromkeys keeps the order of the answers, unlike a set
+    ans_set = dict.fromkeys(answers)
+    match_count = Counter(match_results)
+
+    # every wrong match is kept, so that repeated ones are counted as well
+    false_positive = [key for key in match_results if key not in ans_set]
     true_negative = []
-    for key, val in ans_dict.items():
+    for key in ans_set:
+        val = match_count[key]
         if val == 0:
             true_negative.append(key)
         elif val > 1:
-            print(f'The match result {key} appears {val} times')
+            print(f'The match result {",".join(map(str, key))} appears {val} times')
     
     return false_positive, true_negative
 
 def reassign_event_id(event_string: str) -> str:
-    lines = event_string.split('\n')
-    output = ''
+    # only the lines of a single match are renumbered, so a plain loop is
+    # enough, and every field is kept verbatim apart from the ids
+    rows = []
     node_id_map = {}
     edge_id_map = {}
-    for line in lines:
+    for line in event_string.split('\n'):
         fields = line.split(',')
-        if len(fields) < 6:
+        if len(fields) <= OBJECT_ID_FIELD:
             continue
-        
-        edge_id_map.setdefault(fields[EVENT_ID_FIELD], str(len(edge_id_map) + 1))
-        fields[EVENT_ID_FIELD] = edge_id_map[fields[EVENT_ID_FIELD]]
 
-        node_id_map.setdefault(fields[SUBJECT_ID_FIELD], str(len(node_id_map) + 1))
-        node_id_map.setdefault(fields[OBJECT_ID_FIELD], str(len(node_id_map) + 1))
-        fields[SUBJECT_ID_FIELD] = node_id_map[fields[SUBJECT_ID_FIELD]]
-        fields[OBJECT_ID_FIELD] = node_id_map[fields[OBJECT_ID_FIELD]]
-        output += ','.join(fields) + '\n'
+        fields[EVENT_ID_FIELD] = edge_id_map.setdefault(fields[EVENT_ID_FIELD], str(len(edge_id_map) + 1))
+        fields[SUBJECT_ID_FIELD] = node_id_map.setdefault(fields[SUBJECT_ID_FIELD], str(len(node_id_map) + 1))
+        fields[OBJECT_ID_FIELD] = node_id_map.setdefault(fields[OBJECT_ID_FIELD], str(len(node_id_map) + 1))
+        rows.append(','.join(fields) + '\n')
 
-    return output
+    return ''.join(rows)
 
-def gen_wrong_answer(input_events, event_ids, out_file, expect_num):
+def gen_wrong_answer(data_graph: mmap.mmap, input_events, event_ids, out_file, expect_num):
     print(f'Generating small input graph expecting {expect_num} results to {out_file}')
     event_list = []
     for id in event_ids:
         event_list.append(input_events[id])
     event_list.sort()
-    event_string = ''.join(x[1] for x in event_list)
+    event_string = ''.join(read_line(data_graph, offset) for offset in event_list)
     event_string = reassign_event_id(event_string)
 
     with open(out_file, 'w') as f:
@@ -150,7 +175,7 @@ def gen_wrong_answer(input_events, event_ids, out_file, expect_num):
 
 if __name__ == '__main__':
     import argparse
-    parser = parser = argparse.ArgumentParser(
+    parser = argparse.ArgumentParser(
                 formatter_class=argparse.ArgumentDefaultsHelpFormatter,
                 description='Automatic bug finder')
     parser.add_argument('-a', '--ans-folder',
@@ -165,6 +190,9 @@ if __name__ == '__main__':
                         default='data/temp',
                         type=str,
                         help='the path to output folder')
+    parser.add_argument('-x', '--exit-first',
+                        action='store_true',
+                        help='stop the matcher at the first match result not in the answer')
     parser.add_argument('pattern',
                         type=str,
                         help='the name of pattern (ex. SP2_regex)')
@@ -185,28 +213,35 @@ if __name__ == '__main__':
     answers = parse_ans_file(ans_file)
     
     print('Indexing data graph...')
-    input_events = index_data_graph(os.path.join(data_folder, f'{data}.csv'))
+    with open(os.path.join(data_folder, f'{data}.csv'), 'rb') as f:
+        data_graph = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    input_events = index_data_graph(data_graph)
 
-    run_args = ['cargo', 'run', '--release', '--', f'data/universal_patterns/{pattern}.json', os.path.join(data_folder, f'{data}.csv')]
-    print(run_args)
-    run = subprocess.run(run_args, capture_output=True)
+    subprocess.run(['cargo', 'build', '--release'], check=True)
 
-    match_results = get_match_results_from_stdout(run.stdout)
+    run_args = [BINARY, f'data/universal_patterns/{pattern}.json', os.path.join(data_folder, f'{data}.csv')]
+    print(run_args)
+    stop_answers = dict.fromkeys(answers) if args.exit_first else None
+    match_results = asyncio.run(run_matcher(run_args, stop_answers))
     false_positive, true_negative = find_wrong_answers(answers, match_results)
 
     if len(false_positive) == 0 and len(true_negative) == 0:
         print('The match result is the same as the answer')
         exit(0)
 
-    print('Among {} match results, there are {} results not in answer, and {} answers not found in the results'
-          .format(len(match_results), len(false_positive), len(true_negative)))
+    if args.exit_first and len(false_positive) > 0:
+        print('Stopped the matcher at match result {}, which is not in answer'
+              .format(len(match_results)))
+    else:
+        print('Among {} match results, there are {} results not in answer, and {} answers not found in the results'
+              .format(len(match_results), len(false_positive), len(true_negative)))
     
     if len(false_positive) > 0:
-        ids = false_positive[0].split(',')
+        ids = false_positive[0]
         out_graph = os.path.join(out_dir, f'expect_no_{pattern}.csv')
-        gen_wrong_answer(input_events, ids, out_graph, 0)
+        gen_wrong_answer(data_graph, input_events, ids, out_graph, 0)
     else:
-        ids = true_negative[0].split(',')
+        ids = true_negative[0]
         out_graph = os.path.join(out_dir, f'expect_{pattern}.csv')
-        gen_wrong_answer(input_events, ids, out_graph, 1)
+        gen_wrong_answer(data_graph, input_events, ids, out_graph, 1)
     print('Use the command `{}` to run on the generated graph'.format(' '.join(run_args[:-1] + [out_graph])))
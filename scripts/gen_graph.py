@@ -2,6 +2,7 @@ from argparse import ArgumentParser
 import json
 import random
 from re import sub
+import sys
 
 def parse_pattern(pattern: dict) -> tuple[dict, dict]:
     entities = {}
@@ -24,7 +25,11 @@ def random_topo_sort(in_degree: dict[int, int], adj_list: dict[int, list[int]])
 
     topo_sorted = []
     while not len(queue) == 0:
-        id = queue.pop(random.randrange(len(queue)))
+        # the order of the queue does not matter, so the picked node is
+        # swapped to the end to pop it in O(1)
+        idx = random.randrange(len(queue))
+        queue[idx], queue[-1] = queue[-1], queue[idx]
+        id = queue.pop()
         topo_sorted.append(id)
         for child in adj_list[id]:
             in_degree[child] -= 1
@@ -75,18 +80,21 @@ if __name__ == '__main__':
     time = 1.0
     for i in range(args.n):
         topo_sorted = random_topo_sort(in_degree.copy(), adj_list)
+        # rows of a subgraph are written at once instead of a print per event
+        rows = []
         for idx, pattern_event_id in enumerate(topo_sorted):
             time_str = f'{time:.3f}'
-            time = random.choice([time, time + 1])
+            time += random.getrandbits(1)
             event = events[pattern_event_id]
             event_id = i * len(events) + idx
             subject = entities[event['SubjectID']]
             subject_id = i * entity_id_window + subject['ID']
             object = entities[event['ObjectID']]
             object_id = i * entity_id_window + object['ID']
-            print(','.join([
+            rows.append(','.join([
                 time_str, time_str,
                 str(event_id), event['Signature'],
                 str(subject_id), subject['Signature'],
                 str(object_id), object['Signature'],
-            ]))
+            ]) + '\n')
+        sys.stdout.writelines(rows)
@@ -3,8 +3,25 @@ from typing import TextIO
 import json
 import os
 
-def add_freq_and_flow(input_pattern: str) -> str:
-    old_obj = json.loads(input_pattern)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def load_pattern(content: str) -> dict:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dump_pattern(pattern: dict) -> str:
+    # always written by json, so that the upgraded files are byte-identical
+    # whether orjson is installed or not
+    return json.dumps(pattern, indent=2)
+
+
+def add_freq_and_flow(old_obj: dict) -> dict:
     new_obj = {
         'Version': '0.2.0'
     }
@@ -48,7 +65,7 @@ def add_freq_and_flow(input_pattern: str) -> str:
     new_obj['Entities'] = entities
     new_obj['Events'] = events
 
-    return json.dumps(new_obj, indent=2)
+    return new_obj
 
 upgrade_map = {
     '0.1.0': (add_freq_and_flow, '0.2.0')
@@ -56,8 +73,9 @@ upgrade_map = {
 
 def upgrade_file(pattern_file: TextIO, target_version: str) -> str:
     content = pattern_file.read()
+    pattern = load_pattern(content)
 
-    version = json.loads(content)['Version']
+    version = pattern['Version']
 
     upgrader_chain = []
     while version != target_version:
@@ -66,10 +84,14 @@ def upgrade_file(pattern_file: TextIO, target_version: str) -> str:
         upgrader_chain.append(upgrader)
         version = new_version
 
+    # a pattern already at the target version is returned untouched
+    if not upgrader_chain:
+        return content
+
     for upgrader in upgrader_chain:
-        content = upgrader(content)
+        pattern = upgrader(pattern)
 
-    return content
+    return dump_pattern(pattern)
 
 latest_version = '0.2.0'
 
@@ -1,6 +1,18 @@
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def load_event(inp: str) -> dict:
+    if orjson is not None:
+        return orjson.loads(inp)
+    return json.loads(inp)
+
+
 def extract_node_signature(node_obj: dict) -> str:
     properties = node_obj['properties']
     type: str = properties['type']
@@ -43,17 +55,20 @@ def extract_fields(inp: str, reverse=False) -> list[str]:
         A list of the extracted fields
     """
 
-    inp_obj = json.loads(inp)
-    start_time, end_time = extract_timestamps(inp_obj['r'])
+    inp_obj = load_event(inp)
+    edge = inp_obj['r']
     start_label, end_label = ('m', 'n') if not reverse else ('n', 'm')
+    start_node = inp_obj[start_label]
+    end_node = inp_obj[end_label]
+    start_time, end_time = extract_timestamps(edge)
     return [
         start_time, end_time,
-        inp_obj['r']['id'],
-        extract_edge_signature(inp_obj['r']),
-        inp_obj[start_label]['id'],
-        extract_node_signature(inp_obj[start_label]),
-        inp_obj[end_label]['id'],
-        extract_node_signature(inp_obj[end_label]),
+        edge['id'],
+        extract_edge_signature(edge),
+        start_node['id'],
+        extract_node_signature(start_node),
+        end_node['id'],
+        extract_node_signature(end_node),
     ]
 
 if __name__ == '__main__':
@@ -87,5 +102,7 @@ The fields in the output csv:
     args = parser.parse_args()
 
     import fileinput
-    for line in fileinput.input(args.data_graph):
-        print(','.join(extract_fields(line, args.reverse)))
+    import sys
+    # rows go straight into the buffer of stdout, without a print call per row
+    with fileinput.input(args.data_graph) as inp:
+        sys.stdout.writelines(','.join(extract_fields(line, args.reverse)) + '\n' for line in inp)
@@ -1,5 +1,4 @@
-import json
-from preprocess import extract_timestamps
+from preprocess import extract_timestamps, load_event
 
 def extract_node_signature(node_obj: dict) -> str:
     properties: dict = node_obj['properties']
@@ -42,15 +41,18 @@ def extract_fields(inp: str) -> list[str]:
         A list of the extracted fields
     """
 
-    inp_obj = json.loads(inp)
-    start_time, end_time = extract_timestamps(inp_obj['r'])
-    eid = inp_obj['r']['id']
-    start_id = inp_obj['m']['id']
-    end_id = inp_obj['n']['id']
+    inp_obj = load_event(inp)
+    edge = inp_obj['r']
+    start_node = inp_obj['m']
+    end_node = inp_obj['n']
+    start_time, end_time = extract_timestamps(edge)
+    eid = edge['id']
+    start_id = start_node['id']
+    end_id = end_node['id']
     event_sig = '{}#{}#{}'.format(
-        extract_edge_signature(inp_obj['r']),
-        extract_node_signature(inp_obj['m']),
-        extract_node_signature(inp_obj['n'])
+        extract_edge_signature(edge),
+        extract_node_signature(start_node),
+        extract_node_signature(end_node)
     )
     
     time_unit = 1000000000
@@ -76,5 +78,7 @@ if __name__ == '__main__':
     """
 
     import fileinput
-    for line in fileinput.input():
-        print(','.join(extract_fields(line)))
+    import sys
+    # rows go straight into the buffer of stdout, without a print call per row
+    with fileinput.input() as inp:
+        sys.stdout.writelines(','.join(extract_fields(line)) + '\n' for line in inp)
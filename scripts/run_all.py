@@ -1,61 +1,57 @@
 import typing as t
 import argparse
 import subprocess
-from subprocess import Popen, PIPE
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
 import os
-import re
-import pandas as pd 
+import shlex
+import sys
+
+from experiments import WINDOW_SIZES, init_cpu_slots, set_verbose, needs_rebuild, measure, parse_json_report_line
+
+BINARY = './target/release/ipmes-rust'
 
 def run(pattern_file: str, data_graph: str, window_size: int, pre_run=0, re_run=1) -> t.Union[t.Tuple[int, float, int], None]:
-    run_cmd = ['./target/release/ipmes-rust', pattern_file, data_graph, '-w', str(window_size), '--silent']
-    print('Running: `{}`'.format(' '.join(run_cmd)))
-
-    for _ in range(pre_run):
-        proc = Popen(run_cmd, stdout=None, stderr=None, encoding='utf-8')
-        proc.wait()
-
-    num_match = '0'
-    peak_mem_result = None
-    total_cpu_time = 0.0
-    for i in range(re_run):
-        print(f'Run {i + 1} / {re_run} ...')
-        proc = Popen(run_cmd, stdout=PIPE, stderr=PIPE, encoding='utf-8')
-        outs, errs = proc.communicate()
-        if proc.wait() != 0:
-            print(f'Run failed:\n{errs}')
-            return None
-
-        print(outs)
-
-        num_match = re.search(r'Total number of matches: (\d+)', outs).group(1)
-        cpu_time = re.search(r'CPU time elapsed: (\d+\.\d+) secs', outs).group(1)
-        total_cpu_time += float(cpu_time)
-        peak_mem_result = re.search(r'Peak memory usage: (\d+) (.)B', outs)
-
-    avg_cpu_time = total_cpu_time / re_run
-    num_match = int(num_match)
-    if peak_mem_result is not None:
-        peak_mem = peak_mem_result.group(1)
-        peak_mem_unit = peak_mem_result.group(2)
-
-        multiplier = 1
-        if peak_mem_unit == 'k':
-            multiplier = 2**10
-        elif peak_mem_unit == 'M':
-            multiplier = 2**20
-        elif peak_mem_unit == 'G':
-            multiplier = 2**30
-        else:
-            print(f'Encounter unknown memory unit: {peak_mem_unit}')
-        
-        peak_mem = int(peak_mem) * multiplier
-    else:
-        peak_mem = 0
-    
-    return num_match, avg_cpu_time, peak_mem
+    run_cmd = [BINARY, pattern_file, data_graph, '-w', str(window_size), '--silent', '--json']
+    return measure(run_cmd, pre_run, re_run, parse_json_report_line)
+
+def report_file(out_dir: str, pattern_name: str, graph: str) -> str:
+    return os.path.join(out_dir, 'runs', f'{pattern_name}_{graph}.json')
+
+def emit_makefile(path: str, jobs: list, job_paths: list, out_dir: str, collect_cmd: list[str]):
+    """
+    Write a Makefile which runs every job as its own target, so that `make -j`
+    runs them in parallel and skips the jobs whose report is up to date.
+    The `all` target collects the reports into the result table.
+    """
+    out_file = os.path.join(out_dir, 'run_result.csv')
+    targets = [report_file(out_dir, pattern_name, graph) for pattern_name, graph, _ in jobs]
+    with open(path, 'w') as f:
+        f.write(f'BIN := {BINARY}\n\n')
+        f.write('.PHONY: all\n')
+        f.write(f'all: {out_file}\n\n')
+        f.write(f'{out_file}:' + ''.join(f' \\\n\t{target}' for target in targets) + '\n')
+        f.write(f'\t{shlex.join(collect_cmd)}\n\n')
+        # the same sources as needs_rebuild checks before a normal run; the
+        # binary is touched since cargo keeps it as is if nothing it links changed
+        f.write('$(BIN): $(shell find src -type f) Cargo.toml Cargo.lock\n')
+        f.write('\tcargo build --release\n')
+        f.write('\ttouch $@\n\n')
+        for target, (pattern, data_graph), (_, _, window_size) in zip(targets, job_paths, jobs):
+            f.write(f'{target}: $(BIN) {pattern} {data_graph}\n')
+            f.write('\t@mkdir -p $(@D)\n')
+            f.write(f'\t$(BIN) {pattern} {data_graph} -w {window_size} --silent --json > $@.tmp && mv $@.tmp $@\n\n')
+
+def format_table(columns: list[str], rows: list[list]) -> str:
+    """
+    Format the rows as a right-aligned plain text table.
+    """
+    cells = [columns] + [[f'{v:.6f}' if isinstance(v, float) else str(v) for v in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(columns))]
+    return '\n'.join('  '.join(cell.rjust(width) for cell, width in zip(row, widths)) for row in cells)
 
 if __name__ == '__main__':
-    parser = parser = argparse.ArgumentParser(
+    parser = argparse.ArgumentParser(
                 formatter_class=argparse.ArgumentDefaultsHelpFormatter,
                 description='Run all pattern on all graph')
     parser.add_argument('-d', '--data-graph',
@@ -78,6 +74,14 @@ if __name__ == '__main__':
                     default=0,
                     type=int,
                     help='Number of runs before actual measurement')
+    parser.add_argument('-j', '--jobs',
+                    default=1,
+                    type=int,
+                    help='The number of parallel jobs')
+    parser.add_argument('--cores-per-job',
+                    default=0,
+                    type=int,
+                    help='Pin each job to this many dedicated CPU cores, 0 to disable pinning')
     parser.add_argument('--no-darpa',
                     default=False,
                     action='store_true',
@@ -86,44 +90,121 @@ if __name__ == '__main__':
                     default=False,
                     action='store_true',
                     help='Do not run on SPADE')
+    parser.add_argument('-v', '--verbose',
+                    default=False,
+                    action='store_true',
+                    help='Print the output of every measured run')
+    parser.add_argument('--emit-makefile',
+                    default=None,
+                    type=str,
+                    metavar='PATH',
+                    help='Write the jobs as a Makefile to PATH instead of running them, run it with `make -f PATH -j`')
+    parser.add_argument('--collect',
+                    default=False,
+                    action='store_true',
+                    help='Collect the reports written by the emitted Makefile into the result table instead of running the jobs')
     args = parser.parse_args()
+    set_verbose(args.verbose)
 
     
     if os.getcwd().endswith('scripts'):
         os.chdir('..')
 
-    subprocess.run(['cargo', 'build', '--release'], check=True)
-
-    os.makedirs(args.out_dir, exist_ok=True)
-    
     darpa_graphs = ['dd1', 'dd2', 'dd3', 'dd4']
     spade_graphs = ['attack', 'mix', 'benign']
 
-    run_result = []
-
+    jobs = []
     if not args.no_spade:
-        for i in range(1, 13):
-            for graph in spade_graphs:
-                pattern = os.path.join(args.pattern_dir, f'SP{i}_regex.json')
-                data_graph = os.path.join(args.data_graph, graph + '.csv')
-                res = run(pattern, data_graph, 1800, args.pre_run, args.re_run)
-                if not res is None:
-                    num_match, cpu_time, peak_mem = res
-                    run_result.append([f'SP{i}', graph, num_match, cpu_time, peak_mem / 2**20])
-
+        jobs += [(f'SP{i}', graph, WINDOW_SIZES['SP']) for i in range(1, 13) for graph in spade_graphs]
     if not args.no_darpa:
-        for i in range(1, 6):
-            for graph in darpa_graphs:
-                pattern = os.path.join(args.pattern_dir, f'DP{i}_regex.json')
-                data_graph = os.path.join(args.data_graph, graph + '.csv')
-                res = run(pattern, data_graph, 1000, args.pre_run, args.re_run)
-                if not res is None:
-                    num_match, cpu_time, peak_mem = res
-                    run_result.append([f'DP{i}', graph, num_match, cpu_time, peak_mem / 2**20])
-
-    df = pd.DataFrame(data=run_result, columns=['Pattern', 'Data Graph', 'Num Results', 'CPU Time (sec)', 'Peak Memory (MB)'])
-    print(df.to_string(index=False))
+        jobs += [(f'DP{i}', graph, WINDOW_SIZES['DP']) for i in range(1, 6) for graph in darpa_graphs]
+
+    # the paths of every job are computed once before any run starts
+    job_paths = [
+        (os.path.join(args.pattern_dir, f'{pattern_name}_regex.json'), os.path.join(args.data_graph, graph + '.csv'))
+        for pattern_name, graph, _ in jobs
+    ]
+
+    # Jobs on the same data graph are run next to each other, so that the
+    # graph is still in the page cache when the next pattern reads it. The
+    # result table keeps the job order.
+    run_order = sorted(range(len(jobs)), key=lambda idx: job_paths[idx][1])
+
+    if args.emit_makefile is not None:
+        collect_cmd = [
+            'python3', 'scripts/run_all.py', '--collect',
+            '-d', args.data_graph, '-p', args.pattern_dir, '-o', args.out_dir,
+        ]
+        if args.no_darpa:
+            collect_cmd.append('--no-darpa')
+        if args.no_spade:
+            collect_cmd.append('--no-spade')
+        emit_makefile(
+            args.emit_makefile,
+            [jobs[idx] for idx in run_order],
+            [job_paths[idx] for idx in run_order],
+            args.out_dir,
+            collect_cmd,
+        )
+        print(f'The Makefile is saved to {args.emit_makefile}, run it with `make -f {args.emit_makefile} -j$(nproc)`')
+        sys.exit(0)
+
+    if not args.collect:
+        if needs_rebuild([BINARY], ['src', 'Cargo.toml', 'Cargo.lock']):
+            subprocess.run(['cargo', 'build', '--release'], check=True)
+
+        if args.cores_per_job > 0:
+            init_cpu_slots(args.cores_per_job)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    def run_job(idx: int):
+        pattern, data_graph = job_paths[idx]
+        window_size = jobs[idx][2]
+        return run(pattern, data_graph, window_size, args.pre_run, args.re_run)
+
+    def to_row(idx: int, num_match: int, cpu_time: float, peak_mem: int) -> list:
+        pattern_name, graph, _ = jobs[idx]
+        return [pattern_name, graph, num_match, cpu_time, peak_mem / 2**20]
+
+    columns = ['Pattern', 'Data Graph', 'Num Results', 'CPU Time (sec)', 'Peak Memory (MB)']
     out_file = os.path.join(args.out_dir, 'run_result.csv')
-    df.to_csv(out_file, index=False)
-    print(f'This table is saved to {out_file}')
 
+    job_results = {}
+    if args.collect:
+        for idx, (pattern_name, graph, _) in enumerate(jobs):
+            path = report_file(args.out_dir, pattern_name, graph)
+            if not os.path.exists(path):
+                print(f'Missing report: {path}')
+                continue
+            summary = {}
+            with open(path) as f:
+                for line in f:
+                    parse_json_report_line(line, summary)
+            job_results[idx] = to_row(idx, summary['num_match'], summary['cpu_time'], summary.get('peak_mem', 0))
+    else:
+        # Rows are appended to the output file as soon as their job finishes, so
+        # that the finished results survive a crash in the middle of the sweep.
+        # Once every job is done, the file is rewritten in the job order.
+        with open(out_file, 'w', newline='') as f, ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            futures = {executor.submit(run_job, idx): idx for idx in run_order}
+            for future in as_completed(futures):
+                res = future.result()
+                if res is None:
+                    continue
+                idx = futures[future]
+                row = to_row(idx, *res)
+                job_results[idx] = row
+                writer.writerow(row)
+                f.flush()
+                os.fsync(f.fileno())
+
+    run_result = [job_results[idx] for idx in sorted(job_results)]
+    print(format_table(columns, run_result))
+    with open(out_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(run_result)
+    print(f'This table is saved to {out_file}')
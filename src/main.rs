@@ -4,6 +4,7 @@ use clap::{arg, Parser};
 use log::{info, warn};
 
 use cpu_time::ProcessTime;
+use serde::Serialize;
 
 use ipmes_rust::pattern::{decompose, Pattern};
 use ipmes_rust::process_layers::{
@@ -27,6 +28,18 @@ struct Args {
     /// Enable silent mode will not print individual pattern matches.
     #[arg(short, long, default_value_t = false)]
     silent: bool,
+
+    /// Print the summary as a single line of JSON instead of human-readable text.
+    #[arg(long, default_value_t = false)]
+    json: bool,
+}
+
+/// Machine-readable summary printed in `--json` mode.
+#[derive(Serialize, Debug)]
+struct Report {
+    matches: u32,
+    cpu_seconds: f64,
+    peak_mem_bytes: Option<u64>,
 }
 
 fn main() {
@@ -61,24 +74,39 @@ fn main() {
         }
         num_result += 1;
     }
-    println!("Total number of matches: {num_result}");
-
-    println!(
-        "CPU time elapsed: {:?} secs",
-        start_time.elapsed().as_secs_f64()
-    );
-
-    if let Err(err) = print_peak_memory() {
-        warn!(
-            "Encounter an error when tring to get peak memory usage: {}",
-            err
-        )
+    let cpu_seconds = start_time.elapsed().as_secs_f64();
+    let peak_mem_bytes = match get_peak_memory() {
+        Ok(peak_mem) => Some(peak_mem),
+        Err(err) => {
+            warn!(
+                "Encounter an error when tring to get peak memory usage: {}",
+                err
+            );
+            None
+        }
+    };
+
+    if args.json {
+        let report = Report {
+            matches: num_result,
+            cpu_seconds,
+            peak_mem_bytes,
+        };
+        println!("{}", serde_json::to_string(&report).unwrap());
+    } else {
+        println!("Total number of matches: {num_result}");
+        println!("CPU time elapsed: {:?} secs", cpu_seconds);
+        if let Some(peak_mem) = peak_mem_bytes {
+            println!("Peak memory usage: {} kB", peak_mem / 1024u64);
+        }
     }
 
     info!("Finished");
 }
 
-fn print_peak_memory() -> Result<(), Box<dyn Error>> {
+/// Returns the peak memory usage of this process in bytes.
+#[allow(unreachable_code)]
+fn get_peak_memory() -> Result<u64, Box<dyn Error>> {
     #[cfg(target_family = "windows")]
     {
         use windows::System::Diagnostics::ProcessDiagnosticInfo;
@@ -86,15 +114,16 @@ fn print_peak_memory() -> Result<(), Box<dyn Error>> {
         let mem_usage = info.MemoryUsage()?;
         let mem_report = mem_usage.GetReport()?;
         let max_rss = mem_report.PeakWorkingSetSizeInBytes()?;
-        println!("Peak memory usage: {} kB", max_rss / 1024u64);
+        return Ok(max_rss);
     }
 
     #[cfg(target_family = "unix")]
     {
         use nix::sys::resource::{getrusage, UsageWho};
         let usage = getrusage(UsageWho::RUSAGE_SELF)?;
-        println!("Peak memory usage: {} kB", usage.max_rss());
+        // max_rss is reported in kilobytes
+        return Ok(usage.max_rss() as u64 * 1024u64);
     }
 
-    Ok(())
+    Err("peak memory usage is not supported on this platform".into())
 }
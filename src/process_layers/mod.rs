@@ -1,4 +1,5 @@
 pub mod composition_layer;
+#[cfg_attr(feature = "unoptimized_join", path = "join_layer/mod_unoptimized.rs")]
 pub mod join_layer;
 pub mod matching_layer;
 pub mod parse_layer;